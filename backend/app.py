@@ -1,9 +1,12 @@
 """Main FastAPI application."""
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from src.config import settings
 from src.api.routes import router
+from src.services.pdf_service import shutdown_process_pool
+from src.services.storage_service import StorageService
 
 app = FastAPI(
     title="PDF Summary AI",
@@ -11,6 +14,31 @@ app = FastAPI(
     version="1.0.0"
 )
 
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Reject uploads that declare an oversized body before reading it.
+
+    The streaming read in save_upload still enforces the limit for
+    clients that lie about (or omit) Content-Length; this check just
+    avoids receiving the body at all when the header already exceeds
+    the cap.
+    """
+    if request.method == "POST" and request.url.path == "/upload":
+        content_length = request.headers.get("content-length")
+        if (
+            content_length is not None
+            and content_length.isdigit()
+            and int(content_length) > settings.MAX_FILE_SIZE_MB * 1024 * 1024
+        ):
+            return JSONResponse(
+                status_code=413,
+                content={
+                    "detail": f"PDF file too large (max {settings.MAX_FILE_SIZE_MB}MB)"
+                },
+            )
+    return await call_next(request)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
@@ -21,6 +49,14 @@ app.add_middleware(
 
 app.include_router(router)
 
+
+@app.on_event("shutdown")
+async def release_resources():
+    """Flush buffered metadata and release pooled resources."""
+    StorageService.flush_metadata()
+    StorageService.close_meta()
+    shutdown_process_pool()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
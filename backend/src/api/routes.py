@@ -1,13 +1,17 @@
 """API routes for the PDF Summary application."""
+import asyncio
+from functools import lru_cache
+
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse
 
-from ..models import UploadResponse, HistoryResponse, SummaryResponse, HealthResponse
+from ..models import UploadResponse, HistoryResponse, HealthResponse
 from ..services.pdf_service import PDFService
 from ..services.ai_service import AIService
 from ..services.storage_service import StorageService
 from ..exceptions import (
     PDFProcessingError,
+    FileSizeExceededError,
     OpenAIError,
     SummaryNotFoundError,
     DuplicateFileError
@@ -16,8 +20,14 @@ from ..exceptions import (
 router = APIRouter()
 
 
+@lru_cache(maxsize=1)
 def get_ai_service() -> AIService:
-    """Dependency to get AI service instance."""
+    """Dependency returning the shared AI service instance.
+
+    Cached so every request reuses one AsyncOpenAI client (and its
+    pooled HTTP connections) instead of building a new client per
+    upload.
+    """
     return AIService()
 
 
@@ -45,37 +55,57 @@ async def upload_pdf(
         HTTPException: For various validation and processing errors
     """
     try:
-        # Read file contents
-        contents = await file.read()
-        
-        # Calculate file hash for duplicate detection
-        file_hash = PDFService.calculate_file_hash(contents)
-        
-        # Check for duplicates
-        existing_file = StorageService.check_duplicate_file(file_hash)
-        if existing_file:
-            raise DuplicateFileError(
-                f"File '{existing_file.original_filename}' already exists. "
-                f"Uploaded on {existing_file.created_at[:19].replace('T', ' ')}"
+        # Validate file type before accepting the stream
+        PDFService.validate_file_type(file)
+
+        # Stream PDF to storage (size limit and content hash per chunk)
+        file_id, file_path, file_hash = await PDFService.save_upload(file)
+
+        try:
+            # Duplicate upload: serve the cached result instead of
+            # re-parsing and re-summarizing the same content
+            existing_file = StorageService.check_duplicate_file(file_hash)
+            if existing_file:
+                try:
+                    cached_summary = await asyncio.to_thread(
+                        StorageService.get_summary, existing_file.id
+                    )
+                except SummaryNotFoundError:
+                    # Cached summary is gone; fall back to rejecting
+                    raise DuplicateFileError(
+                        f"File '{existing_file.original_filename}' already exists. "
+                        f"Uploaded on {existing_file.created_at[:19].replace('T', ' ')}"
+                    )
+
+                file_path.unlink(missing_ok=True)
+                return UploadResponse(
+                    id=existing_file.id,
+                    pages=existing_file.pages,
+                    size_mb=existing_file.size_mb,
+                    text_length=existing_file.text_length,
+                    images=existing_file.images,
+                    tables=existing_file.tables,
+                    summary=cached_summary
+                )
+
+            # Validate the saved PDF (CPU-bound, off the event loop)
+            num_pages = await asyncio.to_thread(
+                PDFService.validate_pdf, file_path
             )
-        
-        # Validate the upload
-        num_pages = PDFService.validate_upload(file, contents)
-        
-        # Save PDF file
-        file_id, file_path = PDFService.save_pdf(contents)
-        
-        # Parse PDF content
-        parse_result = PDFService.parse_pdf(file_path)
-        
+        except (DuplicateFileError, PDFProcessingError):
+            # Drop the rejected file from storage
+            file_path.unlink(missing_ok=True)
+            raise
+
+        # Parse PDF content (CPU-bound, off the event loop)
+        parse_result = await asyncio.to_thread(PDFService.parse_pdf, file_path)
+
         # Generate AI summary
-        summary = ai_service.generate_summary(parse_result.text)
-        
-        # Save summary
-        StorageService.save_summary(file_id, summary)
-        
-        # Create and save metadata
-        size_mb = round(len(contents) / (1024 * 1024), 2)
+        summary = await ai_service.generate_summary(parse_result.text)
+
+        # Create metadata, then persist summary and metadata in one
+        # blocking call off the event loop
+        size_mb = round(file_path.stat().st_size / (1024 * 1024), 2)
         metadata = StorageService.create_metadata(
             file_id=file_id,
             filename=f"{file_id}.pdf",
@@ -87,7 +117,9 @@ async def upload_pdf(
             images=parse_result.images,
             tables=parse_result.tables
         )
-        StorageService.save_metadata(metadata)
+        await asyncio.to_thread(
+            StorageService.commit_upload, file_id, summary, metadata
+        )
         
         return UploadResponse(
             id=file_id,
@@ -101,6 +133,10 @@ async def upload_pdf(
         
     except DuplicateFileError as e:
         raise HTTPException(status_code=409, detail=str(e))
+    except FileSizeExceededError as e:
+        # Same 413 as the Content-Length middleware check, so clients
+        # see one status however the limit is detected
+        raise HTTPException(status_code=413, detail=str(e))
     except PDFProcessingError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except OpenAIError as e:
@@ -123,22 +159,29 @@ async def get_history() -> HistoryResponse:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve history: {str(e)}")
 
 
-@router.get("/download/{summary_id}", response_model=SummaryResponse)
-async def download_summary(summary_id: str) -> JSONResponse:
+@router.get("/download/{summary_id}")
+async def download_summary(summary_id: str) -> FileResponse:
     """Download summary by ID.
-    
+
+    Serves the summary file directly so Starlette can use zero-copy
+    sendfile instead of reading the text into memory and JSON-encoding it.
+
     Args:
         summary_id: ID of the summary to download
-        
+
     Returns:
-        Summary content
-        
+        Summary file as plain text
+
     Raises:
         HTTPException: If summary not found
     """
     try:
-        summary = StorageService.get_summary(summary_id)
-        return JSONResponse(content={"summary": summary})
+        summary_path = StorageService.get_summary_path(summary_id)
+        return FileResponse(
+            path=summary_path,
+            media_type="text/plain",
+            filename=f"{summary_id}.txt",
+        )
     except SummaryNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
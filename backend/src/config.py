@@ -2,7 +2,7 @@
 
 import os
 from pathlib import Path
-from typing import List
+from typing import Tuple
 from dotenv import load_dotenv
 from functools import lru_cache
 
@@ -19,9 +19,10 @@ class Settings:
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_MAX_TOKENS: int = 800
     OPENAI_TEMPERATURE: float = 0.3
+    # Longest document prefix sent to the summarization prompt
+    OPENAI_MAX_INPUT_CHARS: int = 12000
 
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
-    ALLOWED_ORIGINS: List[str] = [FRONTEND_URL, "http://localhost:3000"]
 
     ENABLE_CACHING: bool = (
         os.getenv("ENABLE_CACHING", "true").lower() == "true"
@@ -36,13 +37,22 @@ class Settings:
     PDFS_DIR: Path = STORAGE_DIR / "pdfs"
     SUMMARIES_DIR: Path = STORAGE_DIR / "summaries"
     META_DIR: Path = STORAGE_DIR / "meta"
-    META_FILE: Path = META_DIR / "metadata.json"
+    META_FILE: Path = META_DIR / "metadata.jsonl"
 
     MAX_HISTORY_ITEMS: int = 1000
     HISTORY_DISPLAY_LIMIT: int = 5
+    # Compact the append-only metadata log once it grows past this size
+    META_COMPACT_BYTES: int = 10 * 1024 * 1024
 
     def __post_init__(self):
-        """Create directories if they don't exist."""
+        """Create directories and derived settings."""
+        # Built here rather than at class-body scope: class-level
+        # references to other class attributes break under subclassing,
+        # and a tuple is immutable and materialized exactly once
+        self.ALLOWED_ORIGINS: Tuple[str, ...] = (
+            self.FRONTEND_URL,
+            "http://localhost:3000",
+        )
         for directory in [self.PDFS_DIR, self.SUMMARIES_DIR, self.META_DIR]:
             directory.mkdir(parents=True, exist_ok=True)
 
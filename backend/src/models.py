@@ -1,11 +1,16 @@
 """Data models and schemas."""
 from datetime import datetime
 from typing import Dict, Any, Optional
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 class PDFMetadata(BaseModel):
     """PDF file metadata model."""
+
+    # Records are immutable once created; frozen instances are hashable
+    # and guard the cached metadata dicts against accidental mutation
+    model_config = ConfigDict(frozen=True)
+
     id: str
     filename: str
     original_filename: str
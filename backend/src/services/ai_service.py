@@ -1,5 +1,9 @@
 """AI service for generating summaries using OpenAI."""
+import asyncio
+
 import openai
+import orjson
+
 from ..config import settings
 from ..exceptions import OpenAIError
 
@@ -11,42 +15,120 @@ class AIService:
         """Initialize OpenAI client."""
         if not settings.OPENAI_API_KEY:
             raise OpenAIError("OpenAI API key not configured")
-        
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-    
-    def generate_summary(self, text: str) -> str:
+
+        self.client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        # Built once; generate_summary only appends the document text
+        self._prompt_prefix = (
+            "Provide a concise summary of this document in Ukrainian "
+            "language (max 500 words):\n\n"
+        )
+
+    async def generate_summary(self, text: str) -> str:
         """Generate AI summary of the provided text.
-        
+
+        Uses the async OpenAI client so the multi-second API call does not
+        block the event loop while other requests are in flight.
+
         Args:
             text: The text to summarize
-            
+
         Returns:
             Generated summary in Ukrainian
-            
+
         Raises:
             OpenAIError: If API call fails
         """
         if not text.strip():
             return "No text content found in the document."
-        
+
         # Truncate text if too long
-        truncated_text = text[:12000] if len(text) > 12000 else text
-        
-        prompt = (
-            "Provide a concise summary of this document in Ukrainian language (max 500 words):\n\n"
-            f"{truncated_text}"
-        )
-        
+        max_chars = settings.OPENAI_MAX_INPUT_CHARS
+        truncated_text = text[:max_chars] if len(text) > max_chars else text
+
+        prompt = self._prompt_prefix + truncated_text
+
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=settings.OPENAI_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=settings.OPENAI_MAX_TOKENS,
                 temperature=settings.OPENAI_TEMPERATURE,
             )
-            
+
             summary = response.choices[0].message.content
-            return summary.strip() if summary else "Failed to generate summary."
-            
+            # OpenAI returns clean content; no per-call strip copy needed
+            return summary if summary else "Failed to generate summary."
+
+        except Exception as e:
+            raise OpenAIError(f"OpenAI API error: {str(e)}")
+
+    async def generate_summaries_batch(self, texts: list[str]) -> list[str]:
+        """Generate summaries for many documents via the OpenAI Batch API.
+
+        Intended for non-interactive bulk jobs (e.g. re-summarizing
+        history): batched requests cost less than interactive calls and
+        do not hold an HTTP connection per document. The call still
+        blocks until the batch completes, so it is not used by the
+        interactive upload endpoint.
+
+        Args:
+            texts: The texts to summarize, in order
+
+        Returns:
+            Generated summaries, one per input text and in the same order
+
+        Raises:
+            OpenAIError: If the batch fails or expires
+        """
+        max_chars = settings.OPENAI_MAX_INPUT_CHARS
+        lines = [
+            orjson.dumps({
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": settings.OPENAI_MODEL,
+                    "messages": [{
+                        "role": "user",
+                        "content": self._prompt_prefix + text[:max_chars],
+                    }],
+                    "max_tokens": settings.OPENAI_MAX_TOKENS,
+                    "temperature": settings.OPENAI_TEMPERATURE,
+                },
+            })
+            for index, text in enumerate(texts)
+        ]
+
+        try:
+            batch_file = await self.client.files.create(
+                file=b"\n".join(lines),
+                purpose="batch",
+            )
+            batch = await self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                await asyncio.sleep(10)
+                batch = await self.client.batches.retrieve(batch.id)
+
+            if batch.status != "completed" or not batch.output_file_id:
+                raise OpenAIError(f"OpenAI batch {batch.status}")
+
+            output = await self.client.files.content(batch.output_file_id)
+
+            summaries = [""] * len(texts)
+            for line in output.content.splitlines():
+                if not line:
+                    continue
+                item = orjson.loads(line)
+                content = item["response"]["body"]["choices"][0]["message"]["content"]
+                summaries[int(item["custom_id"])] = content
+            return summaries
+
+        except OpenAIError:
+            raise
         except Exception as e:
             raise OpenAIError(f"OpenAI API error: {str(e)}")
\ No newline at end of file
@@ -1,14 +1,15 @@
 """PDF processing service."""
+import asyncio
+import functools
 import hashlib
+import multiprocessing
+import os
 import uuid
 import warnings
-from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import BinaryIO, Optional
+from typing import Optional
 
-import fitz  # PyMuPDF
-import pdfplumber
-from PyPDF2 import PdfReader
 from fastapi import UploadFile
 
 # Suppress font parsing warnings from PDF libraries
@@ -23,145 +24,316 @@ from ..exceptions import (
 )
 from ..models import PDFParseResult
 
+# Chunk size for streaming uploads and hashing (1 MiB)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Documents with at least this many pages are extracted in parallel
+PARALLEL_PAGE_THRESHOLD = 20
+
+# Sampled documents with less text than this are treated as pure scans
+SCANNED_TEXT_THRESHOLD = 100
+
+# Process pool shared across requests, created on first large document
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+@functools.cache
+def _fitz():
+    """Import PyMuPDF on first use.
+
+    The PDF libraries take seconds of cold imports, so deferring them
+    keeps worker startup fast; sys.modules makes repeat calls a dict hit.
+    """
+    import fitz  # PyMuPDF
+
+    return fitz
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool for per-page extraction.
+
+    Workers are spawned rather than forked: the pool is created lazily
+    from a request thread of an already-threaded server, where forking
+    can deadlock on held locks. Spawn costs little here since workers
+    import fitz lazily on first use anyway.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the shared process pool (application shutdown)."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def _parse_page_range(
+    file_path: str, start: int, end: int, max_chars: int, detect_tables: bool
+) -> tuple[str, int, int]:
+    """Extract text, image count, and table count for pages [start, end).
+
+    Module-level so it can be pickled into process-pool workers.
+
+    Args:
+        file_path: Path to the PDF file as a string
+        start: First page index (inclusive)
+        end: Last page index (exclusive)
+        max_chars: Stop collecting text once this many characters are held
+        detect_tables: Whether to run table detection on each page
+
+    Returns:
+        Tuple of (text, images_count, tables_count) for the range
+    """
+    text_parts = []
+    text_length = 0
+    images_count = 0
+    tables_count = 0
+    try:
+        doc = _fitz().open(file_path)
+        for index in range(start, end):
+            page = doc[index]
+            # Text beyond the prompt cap would be thrown away anyway;
+            # images and tables are still counted for the response
+            if text_length < max_chars:
+                page_text = page.get_text("text")
+                if page_text:
+                    text_parts.append(page_text)
+                    text_length += len(page_text)
+            images_count += len(page.get_images(full=True))
+            if detect_tables:
+                try:
+                    tables_count += len(page.find_tables().tables)
+                except Exception:
+                    # Table detection is best-effort; keep the page's text
+                    pass
+        doc.close()
+    except Exception:
+        # Silently fail and keep whatever was extracted so far
+        pass
+
+    return "".join(text_parts)[:max_chars], images_count, tables_count
+
 
 class PDFService:
     """Service for handling PDF operations."""
-    
+
     @staticmethod
-    def validate_upload(file: UploadFile, contents: bytes) -> int:
-        """Validate uploaded PDF file.
-        
+    def validate_file_type(file: UploadFile) -> None:
+        """Validate that the uploaded file is a PDF.
+
         Args:
             file: The uploaded file
-            contents: File contents as bytes
-            
-        Returns:
-            Number of pages in the PDF
-            
+
         Raises:
             InvalidFileTypeError: If file is not a PDF
+        """
+        if file.content_type != "application/pdf":
+            raise InvalidFileTypeError("Only PDF files are supported")
+
+    @staticmethod
+    async def save_upload(file: UploadFile) -> tuple[str, Path, str]:
+        """Stream uploaded PDF to storage in chunks.
+
+        Avoids buffering the whole file in RAM: chunks are written to the
+        destination as they arrive, the size limit is enforced on the
+        running byte count so oversized uploads abort early, and the
+        SHA-256 content hash is computed incrementally in the same pass.
+
+        Args:
+            file: The uploaded file
+
+        Returns:
+            Tuple of (file_id, file_path, file_hash)
+
+        Raises:
             FileSizeExceededError: If file exceeds size limit
+        """
+        file_id = str(uuid.uuid4())
+        file_path = settings.PDFS_DIR / f"{file_id}.pdf"
+        max_bytes = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+
+        sha256_hash = hashlib.sha256()
+        total_bytes = 0
+        try:
+            with open(file_path, "wb") as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    total_bytes += len(chunk)
+                    if total_bytes > max_bytes:
+                        raise FileSizeExceededError(
+                            f"PDF file too large (max {settings.MAX_FILE_SIZE_MB}MB)"
+                        )
+                    sha256_hash.update(chunk)
+                    # Write off the event loop so other requests proceed
+                    await asyncio.to_thread(f.write, chunk)
+        except FileSizeExceededError:
+            # Drop the partially written file
+            file_path.unlink(missing_ok=True)
+            raise
+
+        return file_id, file_path, sha256_hash.hexdigest()
+
+    @staticmethod
+    def validate_pdf(file_path: Path) -> int:
+        """Validate a saved PDF file.
+
+        Args:
+            file_path: Path to the PDF file
+
+        Returns:
+            Number of pages in the PDF
+
+        Raises:
             PageLimitExceededError: If PDF has too many pages
             PDFParsingError: If PDF cannot be read
         """
-        # Validate file type
-        if file.content_type != "application/pdf":
-            raise InvalidFileTypeError("Only PDF files are supported")
-        
-        # Validate file size
-        size_mb = len(contents) / (1024 * 1024)
-        if size_mb > settings.MAX_FILE_SIZE_MB:
-            raise FileSizeExceededError(f"PDF file too large (max {settings.MAX_FILE_SIZE_MB}MB)")
-        
-        # Validate page count
         try:
-            reader = PdfReader(BytesIO(contents))
-            num_pages = len(reader.pages)
+            doc = _fitz().open(file_path)
+            # page_count comes from the trailer, no per-page parsing
+            num_pages = doc.page_count
+            doc.close()
         except Exception as e:
             raise PDFParsingError(f"Cannot read PDF file: {str(e)}")
-            
+
         if num_pages > settings.MAX_PAGES:
             raise PageLimitExceededError(f"PDF has too many pages (max {settings.MAX_PAGES})")
-        
+
         return num_pages
-    
+
     @staticmethod
     def parse_pdf(file_path: Path) -> PDFParseResult:
         """Parse PDF file to extract text, images, and tables.
-        
+
         Args:
             file_path: Path to the PDF file
-            
+
         Returns:
             PDFParseResult with extracted content information
         """
-        # Extract text
-        text = PDFService._extract_text(file_path)
-        
-        # Count images
-        images_count = PDFService._count_images(file_path)
-        
-        # Count tables
-        tables_count = PDFService._count_tables(file_path)
-        
+        text, images_count, tables_count = PDFService._extract_all(file_path)
+
         return PDFParseResult(
             text=text,
             images=images_count,
             tables=tables_count
         )
     
+
     @staticmethod
-    def calculate_file_hash(contents: bytes) -> str:
-        """Calculate SHA-256 hash of file contents.
-        
-        Args:
-            contents: File contents as bytes
-            
-        Returns:
-            Hexadecimal string representation of the hash
-        """
-        sha256_hash = hashlib.sha256()
-        sha256_hash.update(contents)
-        return sha256_hash.hexdigest()
-    
-    @staticmethod
-    def save_pdf(contents: bytes) -> tuple[str, Path]:
-        """Save PDF contents to storage.
-        
+    def _extract_all(file_path: Path) -> tuple[str, int, int]:
+        """Extract text, image count, and table count in a single pass.
+
+        Opens the document once with PyMuPDF and collects all three
+        metrics per page. Table counting uses find_tables, which only
+        detects table bounding boxes — cell contents are never needed,
+        so the expensive cell-extraction step is skipped entirely.
+
+        Large documents are sharded across the process pool so
+        extraction is not limited to one core.
+
         Args:
-            contents: PDF file contents
-            
+            file_path: Path to the PDF file
+
         Returns:
-            Tuple of (file_id, file_path)
+            Tuple of (text, images_count, tables_count)
         """
-        file_id = str(uuid.uuid4())
-        file_path = settings.PDFS_DIR / f"{file_id}.pdf"
-        
-        with open(file_path, "wb") as f:
-            f.write(contents)
-            
-        return file_id, file_path
-    
-    @staticmethod
-    def _extract_text(file_path: Path) -> str:
-        """Extract text from PDF using pdfplumber."""
-        text = ""
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text
+            doc = _fitz().open(file_path)
+            page_count = doc.page_count
+            # Cheap prescreen: pure scans have no text layer, so running
+            # table detection on every page would only burn CPU
+            sample = "".join(
+                doc[index].get_text("text")
+                for index in range(min(3, page_count))
+            )
+            doc.close()
         except Exception:
-            # Silently fail and return empty text
-            pass
-        return text
-    
-    @staticmethod
-    def _count_images(file_path: Path) -> int:
-        """Count images in PDF using PyMuPDF."""
+            page_count = 0
+            sample = ""
+
+        detect_tables = len(sample.strip()) >= SCANNED_TEXT_THRESHOLD
+
+        if page_count >= PARALLEL_PAGE_THRESHOLD:
+            return PDFService._extract_all_parallel(
+                file_path, page_count, detect_tables
+            )
+
+        max_chars = settings.OPENAI_MAX_INPUT_CHARS
+        text_parts = []
+        text_length = 0
         images_count = 0
+        tables_count = 0
         try:
-            doc = fitz.open(file_path)
+            doc = _fitz().open(file_path)
             for page in doc:
+                # Text past the prompt cap is never sent to OpenAI, so
+                # stop extracting it; images are still counted per page
+                if text_length < max_chars:
+                    page_text = page.get_text("text")
+                    if page_text:
+                        text_parts.append(page_text)
+                        text_length += len(page_text)
                 images_count += len(page.get_images(full=True))
+                if detect_tables:
+                    try:
+                        tables_count += len(page.find_tables().tables)
+                    except Exception:
+                        # Table detection is best-effort; keep the page's text
+                        pass
             doc.close()
         except Exception:
-            # Silently fail and return 0
+            # Silently fail and keep whatever was extracted so far
             pass
-        return images_count
-    
+
+        return "".join(text_parts)[:max_chars], images_count, tables_count
+
     @staticmethod
-    def _count_tables(file_path: Path) -> int:
-        """Count tables in PDF using pdfplumber."""
+    def _extract_all_parallel(
+        file_path: Path, page_count: int, detect_tables: bool
+    ) -> tuple[str, int, int]:
+        """Shard per-page extraction across the process pool.
+
+        Pages are split into one contiguous range per worker; text is
+        re-joined in page order and counts are summed.
+
+        Args:
+            file_path: Path to the PDF file
+            page_count: Total number of pages in the document
+            detect_tables: Whether workers should run table detection
+
+        Returns:
+            Tuple of (text, images_count, tables_count)
+        """
+        workers = os.cpu_count() or 1
+        chunk_size = -(-page_count // workers)  # ceiling division
+        max_chars = settings.OPENAI_MAX_INPUT_CHARS
+
+        pool = _get_process_pool()
+        futures = [
+            pool.submit(
+                _parse_page_range,
+                str(file_path),
+                start,
+                min(start + chunk_size, page_count),
+                max_chars,
+                detect_tables,
+            )
+            for start in range(0, page_count, chunk_size)
+        ]
+
+        text_parts = []
+        images_count = 0
         tables_count = 0
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    tables = page.extract_tables()
-                    if tables:
-                        tables_count += len(tables)
-        except Exception:
-            # Silently fail and return 0
-            pass
-        return tables_count
\ No newline at end of file
+        for future in futures:
+            text, images, tables = future.result()
+            text_parts.append(text)
+            images_count += images
+            tables_count += tables
+
+        return "".join(text_parts)[:max_chars], images_count, tables_count
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""Storage backends for summary file I/O."""
+
+import os
+from pathlib import Path
+from typing import Dict, Protocol
+
+
+class StorageBackend(Protocol):
+    """Interface StorageService uses for summary file I/O.
+
+    The seam lets tests swap in an in-memory backend instead of
+    patching individual filesystem calls.
+    """
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        """Write data to path, replacing any existing content."""
+        ...
+
+    def read_text(self, path: Path) -> str:
+        """Read path as UTF-8 text.
+
+        Raises:
+            FileNotFoundError: If path does not exist
+        """
+        ...
+
+    def exists(self, path: Path) -> bool:
+        """Check whether path exists."""
+        ...
+
+
+class FilesystemBackend:
+    """Default backend persisting summaries to disk."""
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        """Write the whole file in a single os.write syscall."""
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def read_text(self, path: Path) -> str:
+        """Read the file; Path.read_text sizes its buffer from a stat."""
+        return path.read_text(encoding="utf-8")
+
+    def exists(self, path: Path) -> bool:
+        """Check for the file on disk."""
+        return path.exists()
+
+
+class InMemoryBackend:
+    """Dict-backed backend for tests; no disk I/O."""
+
+    def __init__(self) -> None:
+        self._files: Dict[Path, bytes] = {}
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        """Store data under path."""
+        self._files[path] = data
+
+    def read_text(self, path: Path) -> str:
+        """Return stored text, mirroring the filesystem error contract."""
+        try:
+            return self._files[path].decode("utf-8")
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def exists(self, path: Path) -> bool:
+        """Check whether path has been written."""
+        return path in self._files
@@ -1,22 +1,101 @@
 """Storage service for managing files and metadata."""
 
-import json
+import heapq
+import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
+
+import orjson
 
 from ..config import settings
 from ..exceptions import SummaryNotFoundError, DuplicateFileError
 from ..models import PDFMetadata
+from .storage_backend import FilesystemBackend, StorageBackend
+
+# How long appended metadata may sit in the coalescing buffer (seconds)
+META_FLUSH_INTERVAL = 0.01
+
+
+@lru_cache(maxsize=4)
+def _iso_now_second(sec: int) -> str:
+    """Format a UTC timestamp, reused for every call in the same second.
+
+    Batch uploads create many records back to back; second-resolution
+    timestamps let them share one datetime formatting pass.
+    """
+    return datetime.utcfromtimestamp(sec).isoformat()
+
+
+def _encode_record(item: dict) -> bytes:
+    """Encode one metadata record as a JSONL line.
+
+    orjson serializes the fixed PDFMetadata field set in C without
+    per-field dispatch at the Python level, so this is the fast path a
+    hand-unrolled encoder would otherwise approximate.
+    """
+    return orjson.dumps(item) + b"\n"
+
+
+@lru_cache(maxsize=256)
+def _summary_path(file_id: str) -> Path:
+    """Build (and memoize) the storage path for a summary file.
+
+    Path composition is pure string work repeated for every save and
+    download of the same id, so the resolved Path is cached.
+    """
+    return settings.SUMMARIES_DIR / f"{file_id}.txt"
+
+
+@lru_cache(maxsize=128)
+def _read_summary(summary_path: Path) -> str:
+    """Read a summary file, caching the text for repeat downloads.
+
+    Summaries are write-once, so the cache never needs mtime-based
+    invalidation; tests swapping the backend clear it explicitly.
+    """
+    return StorageService.backend.read_text(summary_path)
 
 
 class StorageService:
     """Service for handling file storage and metadata operations."""
 
+    # Summary file I/O goes through this seam; tests may swap in an
+    # InMemoryBackend. The metadata log keeps its own append handle.
+    backend: StorageBackend = FilesystemBackend()
+
+    # Lazily built file_hash -> metadata dict index for O(1) duplicate lookup
+    _hash_index: Optional[dict] = None
+    _index_lock = threading.Lock()
+
+    # Parsed metadata log, cached against the file's (mtime_ns, size) so
+    # an unchanged log costs one stat instead of a full read and decode.
+    # Bounded: entries past MAX_HISTORY_ITEMS are dropped at compaction
+    # anyway, so the deque evicts them for free on append
+    _meta_cache: Optional[deque] = None
+    _meta_cache_key: Optional[tuple] = None
+
+    # Encoded log lines waiting to be flushed in one write; concurrent
+    # uploads landing within META_FLUSH_INTERVAL share a single syscall
+    _pending: List[bytes] = []
+    _pending_lock = threading.Lock()
+    _flush_timer: Optional[threading.Timer] = None
+
+    # Long-lived append handle for the metadata log, so successive
+    # flushes skip the open/close syscall pair
+    _meta_fp = None
+
     @staticmethod
     def save_summary(file_id: str, summary: str) -> Path:
         """Save summary to storage.
 
+        The encoded text goes out through the storage backend in one
+        write instead of through the buffered text-IO stack.
+
         Args:
             file_id: Unique identifier for the file
             summary: Summary text to save
@@ -24,59 +103,201 @@ class StorageService:
         Returns:
             Path to the saved summary file
         """
-        summary_path = settings.SUMMARIES_DIR / f"{file_id}.txt"
-        with open(summary_path, "w", encoding="utf-8") as f:
-            f.write(summary)
+        summary_path = _summary_path(file_id)
+        StorageService.backend.write_bytes(
+            summary_path, summary.encode("utf-8")
+        )
         return summary_path
 
     @staticmethod
     def save_metadata(metadata: PDFMetadata) -> None:
-        """Save metadata to the metadata file.
+        """Append metadata to the metadata log.
+
+        The log is append-only JSONL: each upload contributes a single
+        line instead of re-reading and rewriting the whole history file.
+        Lines are buffered for up to META_FLUSH_INTERVAL so bursts of
+        uploads share one write syscall; the in-memory caches are updated
+        immediately, so readers never observe the flush delay. The log is
+        compacted back to the last MAX_HISTORY_ITEMS entries once it
+        grows past META_COMPACT_BYTES.
 
         Args:
             metadata: PDF metadata to save
         """
-        # Load existing metadata
-        all_metadata = StorageService._load_all_metadata()
+        item = metadata.model_dump()
+
+        # Materialize the index first: building it lazily reads the log,
+        # which would force a premature flush of the line queued below
+        hash_index = StorageService._get_hash_index()
+
+        with StorageService._pending_lock:
+            StorageService._pending.append(_encode_record(item))
+            if StorageService._flush_timer is None:
+                timer = threading.Timer(
+                    META_FLUSH_INTERVAL, StorageService.flush_metadata
+                )
+                timer.daemon = True
+                timer.start()
+                StorageService._flush_timer = timer
+
+        # Keep the duplicate-lookup index and parsed-log cache in sync
+        hash_index[metadata.file_hash] = item
+        if StorageService._meta_cache is not None:
+            StorageService._meta_cache.append(item)
+
+    @staticmethod
+    def commit_upload(
+        file_id: str, summary: str, metadata: PDFMetadata
+    ) -> Path:
+        """Persist a processed upload's summary and metadata together.
+
+        Fuses the two storage steps of the upload path into one call so
+        the summary write and the metadata append happen back-to-back in
+        the same worker thread, with no event-loop round trip between
+        them.
+
+        Args:
+            file_id: Unique identifier for the file
+            summary: Generated summary text
+            metadata: PDF metadata to record
+
+        Returns:
+            Path to the saved summary file
+        """
+        summary_path = StorageService.save_summary(file_id, summary)
+        StorageService.save_metadata(metadata)
+        return summary_path
+
+    @staticmethod
+    def flush_metadata() -> None:
+        """Write any buffered metadata lines to the log in one append.
+
+        Called by the coalescing timer, before any on-disk read, and on
+        application shutdown.
+        """
+        with StorageService._pending_lock:
+            if StorageService._flush_timer is not None:
+                StorageService._flush_timer.cancel()
+                StorageService._flush_timer = None
+            if not StorageService._pending:
+                return
+            buffer = b"".join(StorageService._pending)
+            StorageService._pending.clear()
+
+        StorageService._get_meta_fp().write(buffer)
+
+        # The cache already holds the flushed items; re-key it to the
+        # file's new stat so it stays valid
+        if StorageService._meta_cache is not None:
+            StorageService._refresh_meta_cache_key()
+
+        StorageService._compact_if_needed()
+
+    @staticmethod
+    def _get_meta_fp():
+        """Get the persistent unbuffered append handle for the log."""
+        if StorageService._meta_fp is None:
+            with StorageService._pending_lock:
+                if StorageService._meta_fp is None:
+                    StorageService._meta_fp = open(
+                        settings.META_FILE, "ab", buffering=0
+                    )
+        return StorageService._meta_fp
+
+    @staticmethod
+    def close_meta() -> None:
+        """Close the persistent log handle (shutdown and tests)."""
+        with StorageService._pending_lock:
+            if StorageService._meta_fp is not None:
+                StorageService._meta_fp.close()
+                StorageService._meta_fp = None
+
+    @staticmethod
+    def _compact_if_needed() -> None:
+        """Rewrite the metadata log if it has grown past the size threshold.
+
+        Keeps only the last MAX_HISTORY_ITEMS entries, so the O(N) rewrite
+        cost is amortized over many appends. The rewrite lands in a temp
+        file swapped in with os.replace, so concurrent readers always see
+        either the old or the new log, never a half-written one.
+        """
+        try:
+            if settings.META_FILE.stat().st_size < settings.META_COMPACT_BYTES:
+                return
+        except FileNotFoundError:
+            return
 
-        # Add new metadata
-        all_metadata.append(metadata.model_dump())
+        # The append handle is re-opened lazily after the rewrite
+        StorageService.close_meta()
 
-        # Keep only the last N items
-        all_metadata = all_metadata[-settings.MAX_HISTORY_ITEMS :]
+        recent = StorageService._load_all_metadata()
+        tmp_path = settings.META_FILE.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(_encode_record(item) for item in recent))
+        os.replace(tmp_path, settings.META_FILE)
 
-        # Save back to file
-        with open(settings.META_FILE, "w", encoding="utf-8") as f:
-            json.dump(all_metadata, f, ensure_ascii=False, indent=2)
+        StorageService._meta_cache = recent
+        StorageService._refresh_meta_cache_key()
 
     @staticmethod
-    def get_recent_history() -> List[PDFMetadata]:
+    def _refresh_meta_cache_key() -> None:
+        """Re-key the parsed-log cache to the file's current stat."""
+        try:
+            stat = settings.META_FILE.stat()
+            StorageService._meta_cache_key = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            StorageService._meta_cache = None
+            StorageService._meta_cache_key = None
+
+    @staticmethod
+    def get_recent_history() -> List[dict]:
         """Get recent processing history.
 
+        Returns the raw metadata dicts for the response model to validate
+        on the way out. Rows that fail validation (e.g. hand-edited logs
+        or records from an older format) are dropped here, so one bad
+        record can't turn the whole endpoint into an error; only the top
+        few records pay that validation pass.
+
         Returns:
-            List of recent PDF metadata, most recent first
+            List of recent metadata dicts, most recent first
         """
-        all_metadata = StorageService._load_all_metadata()
-
-        # Get last N items and reverse for most recent first
-        recent_items = all_metadata[-settings.HISTORY_DISPLAY_LIMIT :][::-1]
+        # Partial sort: O(N log K) for the top K, and robust against
+        # logs whose append order diverges from timestamp order
+        records = heapq.nlargest(
+            settings.HISTORY_DISPLAY_LIMIT,
+            StorageService._iter_metadata_reversed(),
+            key=lambda item: item.get("created_at", ""),
+        )
 
-        # Convert to PDFMetadata with backward compatibility
-        result = []
-        for item in recent_items:
+        history = []
+        for item in records:
             try:
-                result.append(PDFMetadata(**item))
-            except Exception as e:
-                # Skip invalid items
-                print(f"Skipping invalid metadata item: {e}")
+                PDFMetadata(**item)
+            except Exception:
+                # Skip invalid records
                 continue
+            history.append(item)
+        return history
+
+    @staticmethod
+    def _iter_metadata_reversed() -> Iterator[dict]:
+        """Iterate metadata records newest first, without copying the log.
 
-        return result
+        Yields from the cached deque so consumers that only need the
+        most recent records (history, recency-biased scans) stop early.
+        """
+        yield from reversed(StorageService._load_all_metadata())
 
     @staticmethod
     def get_summary(summary_id: str) -> str:
         """Get summary by ID.
 
+        Repeat reads are served from the text cache, but existence is
+        probed on every call: the cached entry outlives the file, so
+        without the probe a deleted summary would keep being served
+        instead of surfacing as not found.
+
         Args:
             summary_id: ID of the summary to retrieve
 
@@ -86,15 +307,45 @@ class StorageService:
         Raises:
             SummaryNotFoundError: If summary file doesn't exist
         """
-        summary_path = settings.SUMMARIES_DIR / f"{summary_id}.txt"
+        summary_path = _summary_path(summary_id)
 
-        if not summary_path.exists():
+        if not StorageService.backend.exists(summary_path):
             raise SummaryNotFoundError(
                 f"Summary with ID {summary_id} not found"
             )
 
-        with open(summary_path, "r", encoding="utf-8") as f:
-            return f.read()
+        try:
+            return _read_summary(summary_path)
+        except FileNotFoundError:
+            # Lost a race with a concurrent deletion
+            raise SummaryNotFoundError(
+                f"Summary with ID {summary_id} not found"
+            )
+
+    @staticmethod
+    def get_summary_path(summary_id: str) -> Path:
+        """Get the path of a stored summary file.
+
+        Lets callers serve the file directly (e.g. via FileResponse)
+        without reading it into memory first.
+
+        Args:
+            summary_id: ID of the summary to locate
+
+        Returns:
+            Path to the summary file
+
+        Raises:
+            SummaryNotFoundError: If summary file doesn't exist
+        """
+        summary_path = _summary_path(summary_id)
+
+        if not StorageService.backend.exists(summary_path):
+            raise SummaryNotFoundError(
+                f"Summary with ID {summary_id} not found"
+            )
+
+        return summary_path
 
     @staticmethod
     def check_duplicate_file(file_hash: str) -> Optional[PDFMetadata]:
@@ -106,17 +357,37 @@ class StorageService:
         Returns:
             PDFMetadata if duplicate found, None otherwise
         """
-        all_metadata = StorageService._load_all_metadata()
+        item = StorageService._get_hash_index().get(file_hash)
+        if item is None:
+            return None
+
+        # Records come from our own log and were validated when written,
+        # so skip re-validation; set_defaults still backfills legacy rows
+        return PDFMetadata.model_construct(
+            **PDFMetadata.set_defaults(dict(item))
+        )
 
-        for item in all_metadata:
-            if item.get("file_hash") == file_hash:
-                try:
-                    return PDFMetadata(**item)
-                except Exception:
-                    # Skip invalid item
-                    continue
+    @staticmethod
+    def _get_hash_index() -> dict:
+        """Get the in-memory file_hash -> metadata index.
 
-        return None
+        Built once from the metadata log on first access, then kept in
+        sync by save_metadata, so duplicate checks never re-read the log.
+
+        Returns:
+            Dictionary mapping file hashes to metadata dictionaries
+        """
+        if StorageService._hash_index is None:
+            with StorageService._index_lock:
+                if StorageService._hash_index is None:
+                    index = {}
+                    for item in StorageService._load_all_metadata():
+                        file_hash = item.get("file_hash")
+                        if file_hash:
+                            index[file_hash] = item
+                    StorageService._hash_index = index
+
+        return StorageService._hash_index
 
     @staticmethod
     def create_metadata(
@@ -149,7 +420,7 @@ class StorageService:
             original_filename=original_filename,
             file_hash=file_hash,
             summary_file=f"{file_id}.txt",
-            created_at=datetime.utcnow().isoformat(),
+            created_at=_iso_now_second(int(time.time())),
             pages=pages,
             size_mb=size_mb,
             text_length=text_length,
@@ -158,17 +429,42 @@ class StorageService:
         )
 
     @staticmethod
-    def _load_all_metadata() -> List[dict]:
-        """Load all metadata from file.
+    def _load_all_metadata() -> deque:
+        """Load all metadata from the JSONL log.
 
         Returns:
-            List of metadata dictionaries
+            Deque of metadata dictionaries, oldest first, bounded to the
+            last MAX_HISTORY_ITEMS entries
         """
-        if not settings.META_FILE.exists():
-            return []
+        StorageService.flush_metadata()
 
         try:
-            with open(settings.META_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+            stat = settings.META_FILE.stat()
+        except FileNotFoundError:
+            return deque(maxlen=settings.MAX_HISTORY_ITEMS)
+
+        cache_key = (stat.st_mtime_ns, stat.st_size)
+        if (
+            cache_key == StorageService._meta_cache_key
+            and StorageService._meta_cache is not None
+        ):
+            return StorageService._meta_cache
+
+        items: deque = deque(maxlen=settings.MAX_HISTORY_ITEMS)
+        try:
+            with open(settings.META_FILE, "rb") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        items.append(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        # Skip corrupt lines (e.g. truncated by a crash)
+                        continue
+        except FileNotFoundError:
+            return deque(maxlen=settings.MAX_HISTORY_ITEMS)
+
+        StorageService._meta_cache = items
+        StorageService._meta_cache_key = cache_key
+        return items
@@ -1,13 +1,18 @@
 """Tests for API routes."""
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch, MagicMock
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
 from io import BytesIO
 
 from app import app
+from src.api.routes import get_ai_service
+from src.config import settings
 from src.models import PDFMetadata
 from src.exceptions import (
     PDFProcessingError,
+    FileSizeExceededError,
     OpenAIError,
     DuplicateFileError,
     SummaryNotFoundError
@@ -17,9 +22,65 @@ from src.exceptions import (
 @pytest.fixture
 def client():
     """Create test client."""
+    # Drop the cached AI service so per-test AIService patches apply
+    get_ai_service.cache_clear()
     return TestClient(app)
 
 
+@pytest.fixture
+def upload_mocks():
+    """Patch the upload pipeline once, preconfigured for the happy path.
+
+    Yields a namespace of the individual mocks so tests can override
+    single stages (duplicate hit, AI failure, ...) without rebuilding
+    the whole patch stack.
+    """
+    targets = {
+        "save_upload": patch(
+            'src.api.routes.PDFService.save_upload', new_callable=AsyncMock
+        ),
+        "check_duplicate_file": patch(
+            'src.api.routes.StorageService.check_duplicate_file'
+        ),
+        "get_summary": patch('src.api.routes.StorageService.get_summary'),
+        "validate_pdf": patch('src.api.routes.PDFService.validate_pdf'),
+        "parse_pdf": patch('src.api.routes.PDFService.parse_pdf'),
+        "ai_service": patch('src.api.routes.AIService'),
+        "create_metadata": patch(
+            'src.api.routes.StorageService.create_metadata'
+        ),
+        "commit_upload": patch('src.api.routes.StorageService.commit_upload'),
+    }
+
+    with ExitStack() as stack:
+        mocks = SimpleNamespace(
+            **{name: stack.enter_context(target) for name, target in targets.items()}
+        )
+
+        mocks.saved_path = Mock()
+        mocks.saved_path.stat.return_value.st_size = 1024 * 1024
+        mocks.save_upload.return_value = ("test-id", mocks.saved_path, "test-hash")
+        mocks.check_duplicate_file.return_value = None
+        mocks.validate_pdf.return_value = 10
+
+        parse_result = Mock()
+        parse_result.text = "Extracted text"
+        parse_result.images = 2
+        parse_result.tables = 1
+        mocks.parse_pdf.return_value = parse_result
+
+        ai_instance = Mock()
+        ai_instance.generate_summary = AsyncMock(
+            return_value="AI generated summary"
+        )
+        mocks.ai_service.return_value = ai_instance
+        mocks.generate_summary = ai_instance.generate_summary
+
+        mocks.create_metadata.return_value = Mock()
+
+        yield mocks
+
+
 class TestAPI:
     """Test suite for API routes."""
 
@@ -74,72 +135,79 @@ class TestAPI:
             assert response.status_code == 500
             assert "Failed to retrieve history" in response.json()["detail"]
 
-    def test_download_summary_success(self, client):
+    def test_download_summary_success(self, client, tmp_path):
         """Test successful summary download."""
-        with patch('src.api.routes.StorageService.get_summary') as mock_get_summary:
-            mock_get_summary.return_value = "Test summary content"
-            
+        summary_path = tmp_path / "test-id.txt"
+        summary_path.write_text("Test summary content", encoding="utf-8")
+
+        with patch('src.api.routes.StorageService.get_summary_path') as mock_get_path:
+            mock_get_path.return_value = summary_path
+
             response = client.get("/download/test-id")
             assert response.status_code == 200
-            assert response.json() == {"summary": "Test summary content"}
+            assert response.text == "Test summary content"
+            assert response.headers["content-type"].startswith("text/plain")
 
     def test_download_summary_not_found(self, client):
         """Test summary download when not found."""
-        with patch('src.api.routes.StorageService.get_summary') as mock_get_summary:
-            mock_get_summary.side_effect = SummaryNotFoundError("Summary not found")
-            
+        with patch('src.api.routes.StorageService.get_summary_path') as mock_get_path:
+            mock_get_path.side_effect = SummaryNotFoundError("Summary not found")
+
             response = client.get("/download/test-id")
             assert response.status_code == 404
             assert "Summary not found" in response.json()["detail"]
 
-    def test_upload_pdf_success(self, client):
+    def test_upload_pdf_success(self, client, upload_mocks):
         """Test successful PDF upload."""
-        # Create a mock PDF file
         pdf_content = b"Mock PDF content"
         files = {"file": ("test.pdf", BytesIO(pdf_content), "application/pdf")}
-        
-        with patch('src.api.routes.PDFService.calculate_file_hash') as mock_hash, \
-             patch('src.api.routes.StorageService.check_duplicate_file') as mock_duplicate, \
-             patch('src.api.routes.PDFService.validate_upload') as mock_validate, \
-             patch('src.api.routes.PDFService.save_pdf') as mock_save, \
-             patch('src.api.routes.PDFService.parse_pdf') as mock_parse, \
-             patch('src.api.routes.AIService') as mock_ai_service, \
-             patch('src.api.routes.StorageService.save_summary') as mock_save_summary, \
-             patch('src.api.routes.StorageService.create_metadata') as mock_create_meta, \
-             patch('src.api.routes.StorageService.save_metadata') as mock_save_meta:
-            
-            # Setup mocks
-            mock_hash.return_value = "test-hash"
-            mock_duplicate.return_value = None
-            mock_validate.return_value = 10
-            mock_save.return_value = ("test-id", "test-path")
-            
-            mock_parse_result = Mock()
-            mock_parse_result.text = "Extracted text"
-            mock_parse_result.images = 2
-            mock_parse_result.tables = 1
-            mock_parse.return_value = mock_parse_result
-            
-            mock_ai_instance = Mock()
-            mock_ai_instance.generate_summary.return_value = "AI generated summary"
-            mock_ai_service.return_value = mock_ai_instance
-            
-            mock_metadata = Mock()
-            mock_create_meta.return_value = mock_metadata
-            
-            response = client.post("/upload", files=files)
-            
-            assert response.status_code == 200
-            data = response.json()
-            assert data["id"] == "test-id"
-            assert data["pages"] == 10
-            assert data["summary"] == "AI generated summary"
 
-    def test_upload_pdf_duplicate(self, client):
-        """Test PDF upload with duplicate file."""
+        response = client.post("/upload", files=files)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["id"] == "test-id"
+        assert data["pages"] == 10
+        assert data["summary"] == "AI generated summary"
+
+    def test_upload_pdf_duplicate_returns_cached_summary(self, client, upload_mocks):
+        """Test PDF upload with duplicate file returning the cached result."""
         pdf_content = b"Mock PDF content"
         files = {"file": ("test.pdf", BytesIO(pdf_content), "application/pdf")}
-        
+
+        mock_existing = PDFMetadata(
+            id="existing-id",
+            filename="existing.pdf",
+            original_filename="existing.pdf",
+            file_hash="test-hash",
+            summary_file="existing.txt",
+            created_at="2025-01-01T00:00:00",
+            pages=10,
+            size_mb=1.0,
+            text_length=100,
+            images=1,
+            tables=0
+        )
+
+        upload_mocks.check_duplicate_file.return_value = mock_existing
+        upload_mocks.get_summary.return_value = "Cached summary"
+
+        response = client.post("/upload", files=files)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["id"] == "existing-id"
+        assert data["pages"] == 10
+        assert data["summary"] == "Cached summary"
+
+        # Redundant upload is removed from storage
+        upload_mocks.saved_path.unlink.assert_called_once()
+
+    def test_upload_pdf_duplicate_missing_summary(self, client, upload_mocks):
+        """Test duplicate upload when the cached summary is gone."""
+        pdf_content = b"Mock PDF content"
+        files = {"file": ("test.pdf", BytesIO(pdf_content), "application/pdf")}
+
         mock_existing = PDFMetadata(
             id="existing-id",
             filename="existing.pdf",
@@ -153,62 +221,66 @@ class TestAPI:
             images=1,
             tables=0
         )
-        
-        with patch('src.api.routes.PDFService.calculate_file_hash') as mock_hash, \
-             patch('src.api.routes.StorageService.check_duplicate_file') as mock_duplicate:
-            
-            mock_hash.return_value = "test-hash"
-            mock_duplicate.return_value = mock_existing
-            
-            response = client.post("/upload", files=files)
-            
-            assert response.status_code == 409
-            assert "already exists" in response.json()["detail"]
 
-    def test_upload_pdf_invalid_file_type(self, client):
+        upload_mocks.check_duplicate_file.return_value = mock_existing
+        upload_mocks.get_summary.side_effect = SummaryNotFoundError(
+            "Summary not found"
+        )
+
+        response = client.post("/upload", files=files)
+
+        assert response.status_code == 409
+        assert "already exists" in response.json()["detail"]
+
+        # Rejected file is removed from storage
+        upload_mocks.saved_path.unlink.assert_called_once()
+
+    def test_upload_pdf_invalid_file_type(self, client, upload_mocks):
         """Test PDF upload with invalid file type."""
         text_content = b"This is not a PDF"
         files = {"file": ("test.txt", BytesIO(text_content), "text/plain")}
-        
-        with patch('src.api.routes.PDFService.calculate_file_hash') as mock_hash, \
-             patch('src.api.routes.StorageService.check_duplicate_file') as mock_duplicate, \
-             patch('src.api.routes.PDFService.validate_upload') as mock_validate:
-            
-            mock_hash.return_value = "test-hash"
-            mock_duplicate.return_value = None
-            mock_validate.side_effect = PDFProcessingError("Invalid file type")
-            
-            response = client.post("/upload", files=files)
-            
-            assert response.status_code == 400
-            assert "Invalid file type" in response.json()["detail"]
 
-    def test_upload_pdf_ai_error(self, client):
+        response = client.post("/upload", files=files)
+
+        assert response.status_code == 400
+        assert "Only PDF files are supported" in response.json()["detail"]
+
+    def test_upload_pdf_oversized_content_length(self, client):
+        """Test that a declared oversized body is rejected up front."""
+        files = {"file": ("test.pdf", BytesIO(b"x"), "application/pdf")}
+        too_large = str((settings.MAX_FILE_SIZE_MB + 1) * 1024 * 1024)
+
+        response = client.post(
+            "/upload", files=files, headers={"content-length": too_large}
+        )
+
+        assert response.status_code == 413
+        assert "too large" in response.json()["detail"]
+
+    def test_upload_pdf_oversized_stream(self, client, upload_mocks):
+        """Test that the streaming size cap also maps to 413."""
+        pdf_content = b"Mock PDF content"
+        files = {"file": ("test.pdf", BytesIO(pdf_content), "application/pdf")}
+
+        upload_mocks.save_upload.side_effect = FileSizeExceededError(
+            f"PDF file too large (max {settings.MAX_FILE_SIZE_MB}MB)"
+        )
+
+        response = client.post("/upload", files=files)
+
+        assert response.status_code == 413
+        assert "too large" in response.json()["detail"]
+
+    def test_upload_pdf_ai_error(self, client, upload_mocks):
         """Test PDF upload with AI service error."""
         pdf_content = b"Mock PDF content"
         files = {"file": ("test.pdf", BytesIO(pdf_content), "application/pdf")}
-        
-        with patch('src.api.routes.PDFService.calculate_file_hash') as mock_hash, \
-             patch('src.api.routes.StorageService.check_duplicate_file') as mock_duplicate, \
-             patch('src.api.routes.PDFService.validate_upload') as mock_validate, \
-             patch('src.api.routes.PDFService.save_pdf') as mock_save, \
-             patch('src.api.routes.PDFService.parse_pdf') as mock_parse, \
-             patch('src.api.routes.AIService') as mock_ai_service:
-            
-            mock_hash.return_value = "test-hash"
-            mock_duplicate.return_value = None
-            mock_validate.return_value = 10
-            mock_save.return_value = ("test-id", "test-path")
-            
-            mock_parse_result = Mock()
-            mock_parse_result.text = "Extracted text"
-            mock_parse.return_value = mock_parse_result
-            
-            mock_ai_instance = Mock()
-            mock_ai_instance.generate_summary.side_effect = OpenAIError("AI service failed")
-            mock_ai_service.return_value = mock_ai_instance
-            
-            response = client.post("/upload", files=files)
-            
-            assert response.status_code == 500
-            assert "AI service failed" in response.json()["detail"]
\ No newline at end of file
+
+        upload_mocks.generate_summary.side_effect = OpenAIError(
+            "AI service failed"
+        )
+
+        response = client.post("/upload", files=files)
+
+        assert response.status_code == 500
+        assert "AI service failed" in response.json()["detail"]
\ No newline at end of file
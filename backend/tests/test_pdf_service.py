@@ -1,9 +1,9 @@
 """Tests for PDF service."""
 
+import asyncio
 import pytest
 from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock
-from io import BytesIO
+from unittest.mock import AsyncMock, Mock, patch
 
 from fastapi import UploadFile
 
@@ -19,175 +19,235 @@ from src.exceptions import (
 class TestPDFService:
     """Test suite for PDFService."""
 
-    def test_calculate_file_hash(self):
-        """Test file hash calculation."""
-        test_content = b"test content"
-        hash_result = PDFService.calculate_file_hash(test_content)
-
-        # SHA-256 of "test content"
-        expected_hash = (
-            "6ae8a75555209fd6c44157c0aed8016e763ff435a19cf186f76863140143ff72"
-        )
-        assert hash_result == expected_hash
-
-    def test_validate_upload_invalid_content_type(self):
-        """Test validation with invalid content type."""
+    def test_validate_file_type_invalid(self):
+        """Test file type validation with invalid content type."""
         mock_file = Mock(spec=UploadFile)
         mock_file.content_type = "text/plain"
 
         with pytest.raises(
             InvalidFileTypeError, match="Only PDF files are supported"
         ):
-            PDFService.validate_upload(mock_file, b"content")
+            PDFService.validate_file_type(mock_file)
 
-    def test_validate_upload_file_too_large(self):
-        """Test validation with oversized file."""
+    def test_validate_file_type_valid(self):
+        """Test file type validation with a PDF."""
         mock_file = Mock(spec=UploadFile)
         mock_file.content_type = "application/pdf"
 
-        # Create content larger than 50MB
-        large_content = b"x" * (51 * 1024 * 1024)
+        PDFService.validate_file_type(mock_file)
 
-        with pytest.raises(FileSizeExceededError, match="PDF file too large"):
-            PDFService.validate_upload(mock_file, large_content)
+    @patch("src.services.pdf_service.settings")
+    def test_save_upload_streams_to_disk(self, mock_settings, tmp_path):
+        """Test streaming upload to storage."""
+        mock_settings.PDFS_DIR = tmp_path
+        mock_settings.MAX_FILE_SIZE_MB = 50
 
-    @patch("src.services.pdf_service.PdfReader")
-    def test_validate_upload_too_many_pages(self, mock_reader):
-        """Test validation with too many pages."""
         mock_file = Mock(spec=UploadFile)
-        mock_file.content_type = "application/pdf"
+        mock_file.read = AsyncMock(side_effect=[b"test ", b"content", b""])
 
-        # Mock PDF with 101 pages
-        mock_pdf = Mock()
-        mock_pdf.pages = [Mock()] * 101
-        mock_reader.return_value = mock_pdf
+        file_id, file_path, file_hash = asyncio.run(
+            PDFService.save_upload(mock_file)
+        )
 
-        small_content = b"small pdf content"
+        # Check that file_id is a valid UUID string
+        assert len(file_id) == 36
+        assert file_path.name.endswith(".pdf")
+        assert file_path.read_bytes() == b"test content"
+
+        # SHA-256 of "test content", computed incrementally
+        expected_hash = (
+            "6ae8a75555209fd6c44157c0aed8016e763ff435a19cf186f76863140143ff72"
+        )
+        assert file_hash == expected_hash
+
+    @patch("src.services.pdf_service.settings")
+    def test_save_upload_file_too_large(self, mock_settings, tmp_path):
+        """Test streaming upload aborting on oversized file."""
+        mock_settings.PDFS_DIR = tmp_path
+        mock_settings.MAX_FILE_SIZE_MB = 0
+
+        mock_file = Mock(spec=UploadFile)
+        mock_file.read = AsyncMock(side_effect=[b"too big", b""])
+
+        with pytest.raises(FileSizeExceededError, match="PDF file too large"):
+            asyncio.run(PDFService.save_upload(mock_file))
+
+        # Partial file must be cleaned up
+        assert list(tmp_path.iterdir()) == []
+
+    @patch("fitz.open")
+    def test_validate_pdf_too_many_pages(self, mock_fitz):
+        """Test validation with too many pages."""
+        # Mock PDF with 101 pages
+        mock_doc = Mock()
+        mock_doc.page_count = 101
+        mock_fitz.return_value = mock_doc
 
         with pytest.raises(
             PageLimitExceededError, match="PDF has too many pages"
         ):
-            PDFService.validate_upload(mock_file, small_content)
+            PDFService.validate_pdf(Path("test.pdf"))
 
-    @patch("src.services.pdf_service.PdfReader")
-    def test_validate_upload_parsing_error(self, mock_reader):
+    @patch("fitz.open")
+    def test_validate_pdf_parsing_error(self, mock_fitz):
         """Test validation with PDF parsing error."""
-        mock_file = Mock(spec=UploadFile)
-        mock_file.content_type = "application/pdf"
-
-        mock_reader.side_effect = Exception("PDF parsing failed")
+        mock_fitz.side_effect = Exception("PDF parsing failed")
 
         with pytest.raises(PDFParsingError, match="Cannot read PDF file"):
-            PDFService.validate_upload(mock_file, b"content")
+            PDFService.validate_pdf(Path("test.pdf"))
 
-    @patch("src.services.pdf_service.PdfReader")
-    def test_validate_upload_success(self, mock_reader):
+    @patch("fitz.open")
+    def test_validate_pdf_success(self, mock_fitz):
         """Test successful validation."""
-        mock_file = Mock(spec=UploadFile)
-        mock_file.content_type = "application/pdf"
-
         # Mock PDF with 10 pages
-        mock_pdf = Mock()
-        mock_pdf.pages = [Mock()] * 10
-        mock_reader.return_value = mock_pdf
-
-        content = b"valid pdf content"
+        mock_doc = Mock()
+        mock_doc.page_count = 10
+        mock_fitz.return_value = mock_doc
 
-        result = PDFService.validate_upload(mock_file, content)
+        result = PDFService.validate_pdf(Path("test.pdf"))
         assert result == 10
 
-    @patch("src.services.pdf_service.settings")
-    @patch("builtins.open", new_callable=MagicMock)
-    def test_save_pdf(self, mock_open, mock_settings):
-        """Test PDF saving."""
-        mock_settings.PDFS_DIR = Path("/test/pdfs")
+    @patch("fitz.open")
+    def test_extract_all_success(self, mock_fitz):
+        """Test single-pass extraction of text, images, and tables."""
+        mock_fitz_page = Mock()
+        mock_fitz_page.get_text.return_value = "Test page content"
+        mock_fitz_page.get_images.return_value = ["img1", "img2", "img3"]
+        mock_fitz_page.find_tables.return_value.tables = ["table1", "table2"]
 
-        content = b"pdf content"
-        file_id, file_path = PDFService.save_pdf(content)
+        # Prescreen sample has a rich text layer, so tables are detected
+        mock_sample_page = Mock()
+        mock_sample_page.get_text.return_value = "Sampled text " * 10
 
-        # Check that file_id is a valid UUID string
-        assert len(file_id) == 36
-        assert isinstance(file_path, Path)
-        assert file_path.name.endswith(".pdf")
+        mock_doc = Mock()
+        mock_doc.page_count = 2
+        mock_doc.__getitem__ = Mock(return_value=mock_sample_page)
+        mock_doc.__iter__ = Mock(
+            return_value=iter([mock_fitz_page, mock_fitz_page])
+        )
+        mock_doc.close = Mock()
 
-        # Check that file was written
-        mock_open.assert_called_once()
-        mock_open().__enter__().write.assert_called_once_with(content)
+        mock_fitz.return_value = mock_doc
 
-    @patch("src.services.pdf_service.pdfplumber.open")
-    def test_extract_text_success(self, mock_pdfplumber):
-        """Test text extraction success."""
-        # Mock pdfplumber
-        mock_page = Mock()
-        mock_page.extract_text.return_value = "Test page content"
+        text, images, tables = PDFService._extract_all(Path("test.pdf"))
 
-        mock_pdf = Mock()
-        mock_pdf.pages = [mock_page, mock_page]
-        mock_pdf.__enter__ = Mock(return_value=mock_pdf)
-        mock_pdf.__exit__ = Mock(return_value=None)
+        assert text == "Test page contentTest page content"
+        assert images == 6  # 3 images per page * 2 pages
+        assert tables == 4  # 2 tables per page * 2 pages
 
-        mock_pdfplumber.return_value = mock_pdf
+    @patch("fitz.open")
+    def test_extract_all_open_failure(self, mock_fitz):
+        """Test single-pass extraction when the document cannot be opened."""
+        mock_fitz.side_effect = Exception("Extraction failed")
 
-        result = PDFService._extract_text(Path("test.pdf"))
-        assert result == "Test page contentTest page content"
+        text, images, tables = PDFService._extract_all(Path("test.pdf"))
 
-    @patch("src.services.pdf_service.pdfplumber.open")
-    def test_extract_text_failure(self, mock_pdfplumber):
-        """Test text extraction failure."""
-        mock_pdfplumber.side_effect = Exception("Extraction failed")
+        assert text == ""
+        assert images == 0
+        assert tables == 0
 
-        result = PDFService._extract_text(Path("test.pdf"))
-        assert result == ""
+    @patch("fitz.open")
+    def test_extract_all_tables_failure(self, mock_fitz):
+        """Test that table-detection errors keep the page's text."""
+        mock_fitz_page = Mock()
+        mock_fitz_page.get_text.return_value = "Test page content"
+        mock_fitz_page.get_images.return_value = ["img1"]
+        mock_fitz_page.find_tables.side_effect = Exception("Counting failed")
 
-    @patch("src.services.pdf_service.fitz.open")
-    def test_count_images_success(self, mock_fitz):
-        """Test image counting success."""
-        mock_page = Mock()
-        mock_page.get_images.return_value = ["img1", "img2", "img3"]
+        mock_sample_page = Mock()
+        mock_sample_page.get_text.return_value = "Sampled text " * 10
 
         mock_doc = Mock()
-        mock_doc.__iter__ = Mock(return_value=iter([mock_page, mock_page]))
+        mock_doc.page_count = 1
+        mock_doc.__getitem__ = Mock(return_value=mock_sample_page)
+        mock_doc.__iter__ = Mock(return_value=iter([mock_fitz_page]))
         mock_doc.close = Mock()
 
         mock_fitz.return_value = mock_doc
 
-        result = PDFService._count_images(Path("test.pdf"))
-        assert result == 6  # 3 images per page * 2 pages
+        text, images, tables = PDFService._extract_all(Path("test.pdf"))
+
+        assert text == "Test page content"
+        assert images == 1
+        assert tables == 0
+
+    @patch("fitz.open")
+    def test_extract_all_skips_tables_for_scanned_pdf(self, mock_fitz):
+        """Test that table detection is skipped without a text layer."""
+        mock_fitz_page = Mock()
+        mock_fitz_page.get_text.return_value = ""
+        mock_fitz_page.get_images.return_value = ["img1"]
 
-    @patch("src.services.pdf_service.fitz.open")
-    def test_count_images_failure(self, mock_fitz):
-        """Test image counting failure."""
-        mock_fitz.side_effect = Exception("Counting failed")
+        mock_doc = Mock()
+        mock_doc.page_count = 1
+        mock_doc.__getitem__ = Mock(return_value=mock_fitz_page)
+        mock_doc.__iter__ = Mock(return_value=iter([mock_fitz_page]))
+        mock_doc.close = Mock()
+
+        mock_fitz.return_value = mock_doc
 
-        result = PDFService._count_images(Path("test.pdf"))
-        assert result == 0
+        text, images, tables = PDFService._extract_all(Path("test.pdf"))
 
-    @patch("src.services.pdf_service.pdfplumber.open")
-    def test_count_tables_success(self, mock_pdfplumber):
-        """Test table counting success."""
-        mock_page = Mock()
-        mock_page.extract_tables.return_value = [["table1"], ["table2"]]
+        assert text == ""
+        assert images == 1
+        assert tables == 0
+        mock_fitz_page.find_tables.assert_not_called()
 
-        mock_pdf = Mock()
-        mock_pdf.pages = [mock_page]
-        mock_pdf.__enter__ = Mock(return_value=mock_pdf)
-        mock_pdf.__exit__ = Mock(return_value=None)
+    @patch("src.services.pdf_service.settings")
+    @patch("fitz.open")
+    def test_extract_all_stops_at_char_cap(self, mock_fitz, mock_settings):
+        """Test that text extraction stops at the prompt character cap."""
+        mock_settings.OPENAI_MAX_INPUT_CHARS = 10
+
+        mock_fitz_page = Mock()
+        mock_fitz_page.get_text.return_value = "0123456789"
+        mock_fitz_page.get_images.return_value = ["img1"]
+        mock_fitz_page.find_tables.return_value.tables = []
+
+        mock_sample_page = Mock()
+        mock_sample_page.get_text.return_value = "Sampled text " * 10
+
+        mock_doc = Mock()
+        mock_doc.page_count = 3
+        mock_doc.__getitem__ = Mock(return_value=mock_sample_page)
+        mock_doc.__iter__ = Mock(
+            return_value=iter([mock_fitz_page] * 3)
+        )
+        mock_doc.close = Mock()
+
+        mock_fitz.return_value = mock_doc
+
+        text, images, tables = PDFService._extract_all(Path("test.pdf"))
+
+        # Text from pages past the cap is dropped, images still counted
+        assert text == "0123456789"
+        assert mock_fitz_page.get_text.call_count == 1
+        assert images == 3
+
+    @patch("src.services.pdf_service.PDFService._extract_all_parallel")
+    @patch("fitz.open")
+    def test_extract_all_parallel_dispatch(self, mock_fitz, mock_parallel):
+        """Test that large documents are routed to the process pool."""
+        mock_sample_page = Mock()
+        mock_sample_page.get_text.return_value = "Sampled text " * 10
+
+        mock_doc = Mock()
+        mock_doc.page_count = 50
+        mock_doc.__getitem__ = Mock(return_value=mock_sample_page)
+        mock_doc.close = Mock()
+
+        mock_fitz.return_value = mock_doc
+        mock_parallel.return_value = ("text", 1, 2)
 
-        mock_pdfplumber.return_value = mock_pdf
+        result = PDFService._extract_all(Path("test.pdf"))
 
-        result = PDFService._count_tables(Path("test.pdf"))
-        assert result == 2
+        assert result == ("text", 1, 2)
+        mock_parallel.assert_called_once_with(Path("test.pdf"), 50, True)
 
-    @patch("src.services.pdf_service.PDFService._count_tables")
-    @patch("src.services.pdf_service.PDFService._count_images")
-    @patch("src.services.pdf_service.PDFService._extract_text")
-    def test_parse_pdf(
-        self, mock_extract_text, mock_count_images, mock_count_tables
-    ):
+    @patch("src.services.pdf_service.PDFService._extract_all")
+    def test_parse_pdf(self, mock_extract_all):
         """Test complete PDF parsing."""
-        mock_extract_text.return_value = "Extracted text"
-        mock_count_images.return_value = 5
-        mock_count_tables.return_value = 2
+        mock_extract_all.return_value = ("Extracted text", 5, 2)
 
         result = PDFService.parse_pdf(Path("test.pdf"))
 
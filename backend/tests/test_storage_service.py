@@ -2,9 +2,14 @@
 import json
 import pytest
 from pathlib import Path
-from unittest.mock import patch, mock_open
-
-from src.services.storage_service import StorageService
+from unittest.mock import patch
+
+from src.services.storage_backend import FilesystemBackend, InMemoryBackend
+from src.services.storage_service import (
+    StorageService,
+    _read_summary,
+    _summary_path,
+)
 from src.models import PDFMetadata
 from src.exceptions import SummaryNotFoundError
 
@@ -12,34 +17,52 @@ from src.exceptions import SummaryNotFoundError
 class TestStorageService:
     """Test suite for StorageService."""
 
+    @pytest.fixture(autouse=True)
+    def reset_hash_index(self):
+        """Reset the in-memory caches between tests."""
+
+        def drain():
+            StorageService._hash_index = None
+            StorageService._meta_cache = None
+            StorageService._meta_cache_key = None
+            # Drop buffered lines and wait out any in-flight flush, so a
+            # late coalescing timer can't write leftover test records to
+            # the real storage tree after the settings patch has exited
+            StorageService._pending.clear()
+            timer = StorageService._flush_timer
+            if timer is not None:
+                timer.cancel()
+                timer.join()
+                StorageService._flush_timer = None
+            StorageService.backend = FilesystemBackend()
+            StorageService.close_meta()
+
+        drain()
+        _read_summary.cache_clear()
+        _summary_path.cache_clear()
+        yield
+        drain()
+
     @patch('src.services.storage_service.settings')
-    @patch('builtins.open', new_callable=mock_open)
-    def test_save_summary(self, mock_file, mock_settings):
+    def test_save_summary(self, mock_settings, tmp_path):
         """Test summary saving."""
-        mock_settings.SUMMARIES_DIR = Path("/test/summaries")
-
-        file_id = "test-id"
-        summary = "Test summary content"
+        mock_settings.SUMMARIES_DIR = tmp_path
 
-        result = StorageService.save_summary(file_id, summary)
+        result = StorageService.save_summary("test-id", "Test summary content")
 
-        expected_path = Path("/test/summaries") / f"{file_id}.txt"
-        assert result == expected_path
+        assert result == tmp_path / "test-id.txt"
+        assert result.read_text(encoding="utf-8") == "Test summary content"
 
-        mock_file.assert_called_once_with(expected_path, "w", encoding="utf-8")
-        mock_file().write.assert_called_once_with(summary)
-
-    @patch('json.dump')
-    @patch('src.services.storage_service.StorageService._load_all_metadata')
     @patch('src.services.storage_service.settings')
-    @patch('builtins.open', new_callable=mock_open)
-    def test_save_metadata(self, mock_file, mock_settings, mock_load, mock_json_dump):
-        """Test metadata saving."""
-        mock_settings.META_FILE = Path("/test/metadata.json")
+    def test_save_metadata_appends_line(self, mock_settings, tmp_path):
+        """Test metadata saving appends one JSONL line per record."""
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
         mock_settings.MAX_HISTORY_ITEMS = 1000
+        mock_settings.META_COMPACT_BYTES = 10 * 1024 * 1024
 
-        existing_metadata = [{"id": "old-id", "filename": "old.pdf"}]
-        mock_load.return_value = existing_metadata
+        mock_settings.META_FILE.write_text(
+            json.dumps({"id": "old-id", "filename": "old.pdf"}) + "\n"
+        )
 
         new_metadata = PDFMetadata(
             id="new-id",
@@ -56,38 +79,222 @@ class TestStorageService:
         )
 
         StorageService.save_metadata(new_metadata)
+        StorageService.flush_metadata()
+
+        lines = mock_settings.META_FILE.read_text().splitlines()
+        assert len(lines) == 2
+
+        # Existing records are untouched, the new one is appended
+        assert json.loads(lines[0])["id"] == "old-id"
+        assert json.loads(lines[1])["id"] == "new-id"
+
+    @patch('src.services.storage_service.settings')
+    def test_save_metadata_compacts_log(self, mock_settings, tmp_path):
+        """Test metadata log compaction past the size threshold."""
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 2
+        mock_settings.META_COMPACT_BYTES = 1
+
+        for i in range(3):
+            StorageService.save_metadata(
+                PDFMetadata(
+                    id=f"id-{i}",
+                    filename=f"file{i}.pdf",
+                    original_filename=f"original{i}.pdf",
+                    file_hash=f"hash{i}",
+                    summary_file=f"file{i}.txt",
+                    created_at=f"2025-01-0{i + 1}T00:00:00",
+                    pages=1,
+                    size_mb=0.1,
+                    text_length=10,
+                    images=0,
+                    tables=0
+                )
+            )
+
+        StorageService.flush_metadata()
+
+        lines = mock_settings.META_FILE.read_text().splitlines()
+        assert len(lines) == 2
+        assert [json.loads(line)["id"] for line in lines] == ["id-1", "id-2"]
+
+    @patch('src.services.storage_service.settings')
+    def test_compaction_replaces_log_atomically(self, mock_settings, tmp_path):
+        """Test that compaction swaps the rewritten log into place."""
+        import os
+
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 1
+        mock_settings.META_COMPACT_BYTES = 1
+
+        with patch(
+            'src.services.storage_service.os.replace', side_effect=os.replace
+        ) as mock_replace:
+            StorageService.save_metadata(
+                PDFMetadata(
+                    id="only-id",
+                    filename="file.pdf",
+                    original_filename="original.pdf",
+                    file_hash="hash",
+                    summary_file="file.txt",
+                    created_at="2025-01-01T00:00:00",
+                    pages=1,
+                    size_mb=0.1,
+                    text_length=10,
+                    images=0,
+                    tables=0
+                )
+            )
+            StorageService.flush_metadata()
+
+        mock_replace.assert_called_once_with(
+            tmp_path / "metadata.jsonl.tmp", mock_settings.META_FILE
+        )
+        assert not (tmp_path / "metadata.jsonl.tmp").exists()
+        lines = mock_settings.META_FILE.read_text().splitlines()
+        assert json.loads(lines[0])["id"] == "only-id"
+
+    @patch('src.services.storage_service.META_FLUSH_INTERVAL', 60.0)
+    @patch('src.services.storage_service.settings')
+    def test_save_metadata_coalesces_appends(self, mock_settings, tmp_path):
+        """Test that buffered saves land in the log as one flush."""
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 1000
+        mock_settings.META_COMPACT_BYTES = 10 * 1024 * 1024
+
+        for i in range(2):
+            StorageService.save_metadata(
+                PDFMetadata(
+                    id=f"id-{i}",
+                    filename=f"file{i}.pdf",
+                    original_filename=f"original{i}.pdf",
+                    file_hash=f"hash{i}",
+                    summary_file=f"file{i}.txt",
+                    created_at=f"2025-01-0{i + 1}T00:00:00",
+                    pages=1,
+                    size_mb=0.1,
+                    text_length=10,
+                    images=0,
+                    tables=0
+                )
+            )
+
+        # Nothing on disk until the buffer is flushed
+        assert not mock_settings.META_FILE.exists()
 
-        mock_file.assert_called_once_with(mock_settings.META_FILE, "w", encoding="utf-8")
+        StorageService.flush_metadata()
 
-        args, _ = mock_json_dump.call_args
-        written_data = args[0]
+        lines = mock_settings.META_FILE.read_text().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == ["id-0", "id-1"]
 
-        assert isinstance(written_data, list)
-        assert len(written_data) == 2
-        assert written_data[1]["id"] == "new-id"
+    @patch('src.services.storage_service.settings')
+    def test_save_metadata_reuses_log_handle(self, mock_settings, tmp_path):
+        """Test that successive flushes share one append handle."""
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 1000
+        mock_settings.META_COMPACT_BYTES = 10 * 1024 * 1024
+
+        for i in range(2):
+            StorageService.save_metadata(
+                PDFMetadata(
+                    id=f"id-{i}",
+                    filename=f"file{i}.pdf",
+                    original_filename=f"original{i}.pdf",
+                    file_hash=f"hash{i}",
+                    summary_file=f"file{i}.txt",
+                    created_at=f"2025-01-0{i + 1}T00:00:00",
+                    pages=1,
+                    size_mb=0.1,
+                    text_length=10,
+                    images=0,
+                    tables=0
+                )
+            )
+            StorageService.flush_metadata()
+            if i == 0:
+                first_fp = StorageService._meta_fp
+
+        assert StorageService._meta_fp is first_fp
+
+        lines = mock_settings.META_FILE.read_text().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == ["id-0", "id-1"]
+
+    @patch('src.services.storage_service.settings')
+    def test_commit_upload_persists_summary_and_metadata(
+        self, mock_settings, tmp_path
+    ):
+        """Test that commit_upload writes both upload artifacts."""
+        mock_settings.SUMMARIES_DIR = tmp_path
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 1000
+        mock_settings.META_COMPACT_BYTES = 10 * 1024 * 1024
+
+        metadata = PDFMetadata(
+            id="test-id",
+            filename="test.pdf",
+            original_filename="original.pdf",
+            file_hash="hash123",
+            summary_file="test-id.txt",
+            created_at="2025-01-01T00:00:00",
+            pages=10,
+            size_mb=1.5,
+            text_length=1000,
+            images=2,
+            tables=1
+        )
+
+        result = StorageService.commit_upload("test-id", "Summary text", metadata)
+        StorageService.flush_metadata()
+
+        assert result.read_text(encoding="utf-8") == "Summary text"
+        saved = json.loads(mock_settings.META_FILE.read_text())
+        assert saved["id"] == "test-id"
+
+    @patch('src.services.storage_service.settings')
+    def test_save_summary_in_memory_backend(self, mock_settings):
+        """Test the summary round trip through an in-memory backend."""
+        mock_settings.SUMMARIES_DIR = Path("/test/summaries")
+        StorageService.backend = InMemoryBackend()
+
+        StorageService.save_summary("test-id", "Test summary content")
+
+        assert StorageService.get_summary("test-id") == "Test summary content"
 
     @patch('src.services.storage_service.settings')
     def test_get_summary_success(self, mock_settings):
         """Test successful summary retrieval."""
         mock_settings.SUMMARIES_DIR = Path("/test/summaries")
+        backend = InMemoryBackend()
+        backend.write_bytes(
+            Path("/test/summaries/test-id.txt"), b"Test summary"
+        )
+        StorageService.backend = backend
+
+        result = StorageService.get_summary("test-id")
+        assert result == "Test summary"
+
+    @patch('src.services.storage_service.settings')
+    def test_get_summary_deleted_after_read(self, mock_settings, tmp_path):
+        """Test that deleting a summary invalidates the cached text."""
+        mock_settings.SUMMARIES_DIR = tmp_path
+        summary_path = tmp_path / "test-id.txt"
+        summary_path.write_text("Test summary", encoding="utf-8")
 
-        summary_content = "Test summary"
-        summary_path = Path("/test/summaries/test-id.txt")
+        assert StorageService.get_summary("test-id") == "Test summary"
 
-        with patch('pathlib.Path.exists', return_value=True), \
-             patch('builtins.open', mock_open(read_data=summary_content)):
+        summary_path.unlink()
 
-            result = StorageService.get_summary("test-id")
-            assert result == summary_content
+        with pytest.raises(SummaryNotFoundError):
+            StorageService.get_summary("test-id")
 
     @patch('src.services.storage_service.settings')
     def test_get_summary_not_found(self, mock_settings):
         """Test summary not found error."""
         mock_settings.SUMMARIES_DIR = Path("/test/summaries")
+        StorageService.backend = InMemoryBackend()
 
-        with patch('pathlib.Path.exists', return_value=False):
-            with pytest.raises(SummaryNotFoundError, match="Summary with ID test-id not found"):
-                StorageService.get_summary("test-id")
+        with pytest.raises(SummaryNotFoundError, match="Summary with ID test-id not found"):
+            StorageService.get_summary("test-id")
 
     @patch('src.services.storage_service.StorageService._load_all_metadata')
     @patch('src.services.storage_service.settings')
@@ -139,10 +346,65 @@ class TestStorageService:
         result = StorageService.get_recent_history()
 
         assert len(result) == 2
-        assert result[0].id == "new-2"
-        assert result[1].id == "new-1"
-        assert result[1].original_filename == "original1.pdf"
-        assert result[1].file_hash == "hash123"
+        assert result[0]["id"] == "new-2"
+        assert result[1]["id"] == "new-1"
+        assert result[1]["original_filename"] == "original1.pdf"
+        assert result[1]["file_hash"] == "hash123"
+
+    @patch('src.services.storage_service.StorageService._load_all_metadata')
+    @patch('src.services.storage_service.settings')
+    def test_get_recent_history_orders_by_created_at(
+        self, mock_settings, mock_load
+    ):
+        """Test that history is newest first even for unordered logs."""
+        mock_settings.HISTORY_DISPLAY_LIMIT = 3
+
+        mock_load.return_value = [
+            {
+                "id": f"id-{i}",
+                "filename": f"file{i}.pdf",
+                "summary_file": f"file{i}.txt",
+                "created_at": f"2025-01-{i:02d}T00:00:00",
+                "pages": 1,
+                "size_mb": 0.1,
+                "text_length": 10,
+                "images": 0,
+                "tables": 0
+            }
+            for i in (3, 9, 1, 7, 5)
+        ]
+
+        result = StorageService.get_recent_history()
+
+        assert [item["id"] for item in result] == ["id-9", "id-7", "id-5"]
+
+    @patch('src.services.storage_service.StorageService._load_all_metadata')
+    @patch('src.services.storage_service.settings')
+    def test_get_recent_history_skips_invalid_records(
+        self, mock_settings, mock_load
+    ):
+        """Test that a schema-invalid record doesn't break history."""
+        mock_settings.HISTORY_DISPLAY_LIMIT = 5
+
+        mock_load.return_value = [
+            {
+                "id": "valid-id",
+                "filename": "valid.pdf",
+                "summary_file": "valid.txt",
+                "created_at": "2025-01-01T00:00:00",
+                "pages": 1,
+                "size_mb": 0.1,
+                "text_length": 10,
+                "images": 0,
+                "tables": 0
+            },
+            # Parseable JSON but missing required fields
+            {"id": "broken-id", "created_at": "2025-01-02T00:00:00"}
+        ]
+
+        result = StorageService.get_recent_history()
+
+        assert [item["id"] for item in result] == ["valid-id"]
 
     @patch('src.services.storage_service.StorageService._load_all_metadata')
     def test_check_duplicate_file_found(self, mock_load):
@@ -170,6 +432,66 @@ class TestStorageService:
         assert result.id == "existing-id"
         assert result.file_hash == "duplicate-hash"
 
+    @patch('src.services.storage_service.StorageService._load_all_metadata')
+    def test_check_duplicate_file_legacy_defaults(self, mock_load):
+        """Test that legacy records get backfilled fields on a hit."""
+        mock_load.return_value = [
+            {
+                "id": "legacy-id",
+                "filename": "legacy.pdf",
+                "file_hash": "legacy-hash",
+                "summary_file": "legacy.txt",
+                "created_at": "2025-01-01T00:00:00",
+                "pages": 1,
+                "size_mb": 0.1,
+                "text_length": 10,
+                "images": 0,
+                "tables": 0
+            }
+        ]
+
+        result = StorageService.check_duplicate_file("legacy-hash")
+
+        assert result is not None
+        assert result.original_filename == "legacy.pdf"
+
+    @patch('src.services.storage_service.StorageService._load_all_metadata')
+    def test_check_duplicate_file_index_loaded_once(self, mock_load):
+        """Test that repeated duplicate checks reuse the in-memory index."""
+        mock_load.return_value = []
+
+        for _ in range(3):
+            assert StorageService.check_duplicate_file("some-hash") is None
+
+        mock_load.assert_called_once()
+
+    @patch('src.services.storage_service.settings')
+    def test_save_metadata_updates_hash_index(self, mock_settings, tmp_path):
+        """Test that saved metadata is immediately visible to duplicate checks."""
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 1000
+        mock_settings.META_COMPACT_BYTES = 10 * 1024 * 1024
+
+        metadata = PDFMetadata(
+            id="new-id",
+            filename="new.pdf",
+            original_filename="original.pdf",
+            file_hash="hash123",
+            summary_file="new.txt",
+            created_at="2025-01-01T00:00:00",
+            pages=10,
+            size_mb=1.5,
+            text_length=1000,
+            images=2,
+            tables=1
+        )
+
+        StorageService.save_metadata(metadata)
+
+        result = StorageService.check_duplicate_file("hash123")
+        assert result is not None
+        assert result.id == "new-id"
+
     @patch('src.services.storage_service.StorageService._load_all_metadata')
     def test_check_duplicate_file_not_found(self, mock_load):
         """Test duplicate file detection - not found."""
@@ -194,8 +516,9 @@ class TestStorageService:
 
     def test_create_metadata(self):
         """Test metadata creation."""
-        with patch('src.services.storage_service.datetime') as mock_datetime:
-            mock_datetime.utcnow.return_value.isoformat.return_value = "2025-01-01T12:00:00"
+        # 2025-01-01T12:00:00 UTC
+        with patch('src.services.storage_service.time') as mock_time:
+            mock_time.time.return_value = 1735732800.5
 
             result = StorageService.create_metadata(
                 file_id="test-id",
@@ -221,35 +544,69 @@ class TestStorageService:
             assert result.images == 2
             assert result.tables == 1
 
+    def test_iso_now_second_cached(self):
+        """Test that timestamps within one second share a format pass."""
+        from src.services.storage_service import _iso_now_second
+
+        assert _iso_now_second(1735732800) is _iso_now_second(1735732800)
+        assert _iso_now_second(1735732800) == "2025-01-01T12:00:00"
+
     @patch('src.services.storage_service.settings')
-    def test_load_all_metadata_file_not_exists(self, mock_settings):
+    def test_load_all_metadata_file_not_exists(self, mock_settings, tmp_path):
         """Test loading metadata when file doesn't exist."""
-        mock_settings.META_FILE = Path("/test/metadata.json")
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 1000
 
-        with patch('pathlib.Path.exists', return_value=False):
-            result = StorageService._load_all_metadata()
-            assert result == []
+        result = StorageService._load_all_metadata()
+        assert list(result) == []
 
     @patch('src.services.storage_service.settings')
-    def test_load_all_metadata_success(self, mock_settings):
+    def test_load_all_metadata_success(self, mock_settings, tmp_path):
         """Test successful metadata loading."""
-        mock_settings.META_FILE = Path("/test/metadata.json")
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 1000
 
-        test_data = [{"id": "test", "filename": "test.pdf"}]
+        test_data = [
+            {"id": "test-1", "filename": "test1.pdf"},
+            {"id": "test-2", "filename": "test2.pdf"},
+        ]
+        mock_settings.META_FILE.write_text(
+            "".join(json.dumps(item) + "\n" for item in test_data)
+        )
 
-        with patch('pathlib.Path.exists', return_value=True), \
-             patch('builtins.open', mock_open(read_data=json.dumps(test_data))):
+        result = StorageService._load_all_metadata()
+        assert list(result) == test_data
 
-            result = StorageService._load_all_metadata()
-            assert result == test_data
+    @patch('src.services.storage_service.settings')
+    def test_load_all_metadata_cached_until_file_changes(
+        self, mock_settings, tmp_path
+    ):
+        """Test that an unchanged log is served from the parsed cache."""
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 1000
+        mock_settings.META_FILE.write_text(
+            json.dumps({"id": "test-1"}) + "\n"
+        )
+
+        first = StorageService._load_all_metadata()
+        # Unchanged file: same parsed list is returned, no re-read
+        assert StorageService._load_all_metadata() is first
+
+        with open(mock_settings.META_FILE, "a") as f:
+            f.write(json.dumps({"id": "test-2"}) + "\n")
+
+        result = StorageService._load_all_metadata()
+        assert [item["id"] for item in result] == ["test-1", "test-2"]
 
     @patch('src.services.storage_service.settings')
-    def test_load_all_metadata_json_error(self, mock_settings):
-        """Test metadata loading with JSON error."""
-        mock_settings.META_FILE = Path("/test/metadata.json")
+    def test_load_all_metadata_skips_corrupt_lines(self, mock_settings, tmp_path):
+        """Test metadata loading with a corrupt line in the log."""
+        mock_settings.META_FILE = tmp_path / "metadata.jsonl"
+        mock_settings.MAX_HISTORY_ITEMS = 1000
 
-        with patch('pathlib.Path.exists', return_value=True), \
-             patch('builtins.open', mock_open(read_data="invalid json")):
+        mock_settings.META_FILE.write_text(
+            "invalid json\n" + json.dumps({"id": "test", "filename": "test.pdf"}) + "\n"
+        )
 
-            result = StorageService._load_all_metadata()
-            assert result == []
+        result = StorageService._load_all_metadata()
+        assert list(result) == [{"id": "test", "filename": "test.pdf"}]
@@ -37,10 +37,6 @@ interface HistoryResponse {
   history: HistoryItem[]
 }
 
-interface SummaryResponse {
-  summary: string
-}
-
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
 export function useApi() {
@@ -107,10 +103,10 @@ export function useApi() {
         throw new Error('Summary not found')
       }
 
-      const result: SummaryResponse = await response.json()
-      
+      const summary = await response.text()
+
       return {
-        data: result.summary,
+        data: summary,
         error: null,
         loading: false
       }